@@ -1,10 +1,15 @@
 import streamlit as st
 import numpy as np
 from PIL import Image
-import tensorflow as tf
-import base64
 import os
-import time
+from lokatmala import IMG_SIZE, MODEL_DIR, class_names, filosofi_dict, load_image, preprocess_image, resize_image
+from prediction_cache import PredictionCache, model_fingerprint
+from inference_server import predict_remote
+from backends import load_backend
+from warmup import BackgroundModel, dummy_batch
+import metrics
+from embedding_index import INDEX_DIR, EmbeddingIndex
+from tiling import predict_tiled
 
 # -------------------- Konfigurasi Halaman --------------------
 st.set_page_config(page_title="Lokatmala - Deteksi Motif Batik", layout="wide")
@@ -70,31 +75,29 @@ def add_custom_css():
     """
     st.markdown(css, unsafe_allow_html=True)
 
-# -------------------- Fungsi Tambah Logo --------------------
-def add_logo_base64(logo_path):
-    with open(logo_path, "rb") as f:
-        logo_data = f.read()
-    logo_base64 = base64.b64encode(logo_data).decode()
+# -------------------- Aset Statis --------------------
+# Logo & banner disajikan lewat static serving Streamlit (.streamlit/config.toml),
+# jadi browser cukup mengunduhnya sekali, bukan base64 di setiap rerun.
+def static_url(filename):
+    return f"app/static/{filename}"
 
+# -------------------- Fungsi Tambah Logo --------------------
+def add_logo(logo_file):
     logo_html = f"""
     <div style="position: absolute; top: 15px; left: 20px; z-index: 999;">
-        <img src="data:image/png;base64,{logo_base64}" alt="Logo" style="height: 60px;">
+        <img src="{static_url(logo_file)}" alt="Logo" style="height: 60px;">
     </div>
     """
     st.markdown(logo_html, unsafe_allow_html=True)
 
 # -------------------- Fungsi Banner Gambar Shadow --------------------
-def add_shadow_banner(image_path):
-    with open(image_path, "rb") as f:
-        bg_data = f.read()
-    bg_base64 = base64.b64encode(bg_data).decode()
-
+def add_shadow_banner(image_file):
     banner_html = f"""
     <style>
     .shadow-header {{
         position: relative;
         background: linear-gradient(rgba(0,0,0,0.6), rgba(0,0,0,0.6)),
-                    url("data:image/png;base64,{bg_base64}");
+                    url("{static_url(image_file)}");
         background-size: cover;
         background-position: center;
         border-radius: 16px;
@@ -120,48 +123,75 @@ def add_shadow_banner(image_path):
 
 # -------------------- Panggilan Semua Komponen --------------------
 add_custom_css()
-add_logo_base64("logo lokatmala.png")     # ← pastikan nama & lokasi file sesuai
-add_shadow_banner("bg3.png")       # ← pastikan file ini ada
+add_logo("logo_lokatmala.png")     # ← file di folder static/
+add_shadow_banner("bg3.jpg")       # ← file di folder static/
+
+# -------------------- Indeks Kemiripan Motif (Opsional) --------------------
+# Dibangun dengan embedding_index.py; jika tidak ada, bagian motif serupa disembunyikan.
+# Indeks yang dibuat dari model lain tidak dipakai (skor kemiripannya tidak bermakna).
+@st.cache_resource
+def load_embedding_index():
+    index = EmbeddingIndex(os.environ.get("LOKATMALA_INDEX_DIR", INDEX_DIR))
+    if not index.exists:
+        return None, None
+    if index.fingerprint != model_fingerprint(MODEL_DIR):
+        return None, "indeks dibuat dengan model lain, bangun ulang dengan embedding_index.py build"
+    return index, None
+
+embedding_index, index_problem = load_embedding_index()
+
+# -------------------- Load Model di Latar Belakang (Cache) --------------------
+# Backend dipilih lewat LOKATMALA_BACKEND (savedmodel / tflite-fp16 / tflite-int8).
+# Model dimuat + dipanaskan di thread terpisah; halaman tidak menunggu.
+def uses_embedding(backend):
+    # Satu forward pass → kelas + embedding, hanya untuk backend yang mendukung
+    return embedding_index is not None and backend.supports_embedding
+
+def warm_up(backend):
+    # Panaskan jalur yang benar-benar dipakai halaman: predict (mode tile) dan embedding
+    backend.predict(dummy_batch())
+    if uses_embedding(backend):
+        try:
+            backend.predict_with_embedding(dummy_batch())
+        except Exception as e:
+            # Motif serupa hanya fitur tambahan; klasifikasi tetap berjalan tanpanya
+            backend.supports_embedding = False
+            backend.embedding_error = f"embedding tidak dapat diambil dari model ({e})"
 
-# -------------------- Load Model Sekali (Cache) --------------------
 @st.cache_resource
 def load_model():
-    return tf.keras.models.load_model("Lokatmala_saved")  # <-- Ganti ke folder SavedModel
-
-model = load_model()
-infer = model.signatures["serving_default"]
-
-# Label kelas (urutan harus sama dengan model)
-class_names = [
-    "Candramawat", "Elang Jawa Situ Gunung", "Garuda Ngupuk", "Jantung Kole", "Leungli",
-    "Makara", "Mandala Bagja", "Manuk Julang", "Masagi", "Mata Air Sukabumi",
-    "Merak Kinanti", "Mozaik Kadudampit", "Nakamesta", "Pakwan", "Palawan",
-    "Penyu Sukabumian", "Puyuh", "Rereng Gunung Parang", "Rereng Tjaiwangi", "Wijayakusumah"
-]
-
-# Dictionary filosofi
-filosofi_dict = {
-    "Candramawat": "Pola hias batik Cendramawat terinspirasi dari dongeng Sunda tentang Nini anteh, sebuah dongeng yang mengisahkan bercak hitam di permukaan bulan purnama. Dalam cerita ini, Nini anteh dikisahkan sebagai seorang nenek menenun kain sambil ditemani oleh seekor kucing Bernama Candramawat. Nama Candramawat sendiri diambil dari kata ‘Candra’ yang berarti ‘bulan’ dan ‘Mawat’ yang memiliki makna ‘keberuntungan’. Pola hias batik ini mengangkat nilai nilai filosofi tentang ketekunan, cinta kasih, dan harapan akan keberuntungan, menjadikannya symbol budaya yang kaya makna dari tradisi lisan Sunda. Selain itu, di daerah Cikananga, Kabupaten Sukabumi hingga kini masih terdapat konservasi macan dahan (Neofelis Diardi), spesies kucing besar atau nama lain dari kucing Candramawat.",
-    "Elang Jawa Situ Gunung": "Pola hias batik Elang Jawa Situ Gunung terinspirasi dari burung Elang Jawa (Nisaetus artelsi), yang juga dikenal sebagai burung garuda. Pola hias batik ini juga menggali inspiras dari lambang negara Indonesia sebagai simbol kekuatan, perlindungan, dan kebijaksanaan. Populasi Elang Jawa, yang merupakan spesies endemik Indonesia, mash dapat ditemukan di kawasan konservasi Cimungkad, Situ Gunung, Kadudampit Kabupaten Sukabumi. Elang Jawa Situ Gunung tidak hanya merepresentasikan keindahan alam dan keanekaragaman hayati Indonesia, tetapi juga mengandung pesan mendalam tentang pelestarian alam serta kebanggaan terhadap kekayaan fauna endemik Indonesia.",
-    "Garuda Ngupuk": "Pola hias batik Garuda Ngupuk terinspirasi dari konsep tata ruang pembangunan pusat pemerintangan yang ideal dalam budaya Sunda. Filosofi mendalam yang terkandung dalam pola hias batik ini mengajarkan bahwa setiap manusia perlu mrmiliki sumber kehidupan yang memadai, seperti keluasa ilmu pengetahuan, kemampuan beradaptasi secara dinamis dalam berbagai situasi, serta keteguhan hati untuk menghadapi segala tantangan. Dalam kepercayaan tradisional Masyarakat Sunda, lahan yang baik untuk pusat pemerintahan diibaratkan seperti “Garuda ngupuk, bahe ngaler-ngetan, deukeut pangguyangan badak putih”. Ungkapan ini menggambarkan bahwa Lokasi pusat kehidupan atau pusat pemerintahan harus strategis dan mendukung dari segala aspek, salah satunya dekat dengan sumber air yang melimpah. Garuda Ngupuk menjadi symbol perpaduan antara kearifan local, harapan akan kesejahteraan dan visi pembangunan yang berkelanjutan. ",
-    "Jantung Kole": "Pola hias batik Jantung Kole terinspirasi dari bentuk tumbuhan pisang Kole (Musa Salaccensis), terutama bagian jantungnya yang berwarna merah keunguan. Pisang Kole adalah salah satu jenis pisang asli Jawa Barat yang kini tumbuh lar di lereng-lereng hutan atau di bawah naungan pohon, jenis pisang ini mash banyak dijumpai di dataran tinggi Taman Nasional Gunung Gede Pangrango, dengan ciri khas buahnya buah tegak, kecil berwarna keunguan dan memiliki tekstur kesat di lidah.Dalam legenda Pakujajar di Gunung Parang, tokoh Wangsa Suta mendapat perintah untuk mendirikan pemukiman di wilayah dengan cir-ciri khusus: permukaan tanah miring ke selatan, adanya pohon beringin kembar, tanaman paku berjajar dengan lima dahan, serta keberadaan pohon pisang kole atau pisang hutan, yang memiliki daun berwarna ungu. Kisah ini menambahkan makna historis dan filosofis pada pola hias batik Jantung Kole, yang merepresentasikan keunikan alam dan kekayaan vegetasi tanaman yang khas.",
-    "Leungli": "Pola hias batik Leungli terinspirasi dari dongeng Sunda tentang Si Leungli, kisah penuh makna yang menceritakan Nyi Bungsu Rarang, seorang gadis malang yang menemukan persahabatan sejati dengan seekor ikan mas bernama Si Leungli. Dongeng ini mengajarkan bahwa alam akan memberikan kebaikan jika diperlakukan dengan baik. Ungkapan 'Melak cabé jadi cabé, melak onténg jadi bonténg', menggambarkan pesan moral bahwa kebaikan akan selalu berbuah kebaikan, begitu pula sebaliknya. Si Leungli juga menjadi simbol ekologis yang mengingatkan kita bahwa ikan hanya dapat hidup dan berkembang di lingkungan yang bersih, berair jernih, dan diperlakukan dengan baik. Di Sukabumi spesies ikan mas (Cyprinus carpio Linnaeus) yang tumbuh dengan baik, berkualitas dan menjadi aset yang hingga kini mash dibudidayakan di Balai Besar Perikanan Budidaya Air Tawar (BBPBAT) Sukabumi, dahulu bernama Landbouw School tahun 1920 pada zaman Belanda yang menjadi sekolah pertanian di Sukabumi.",
-    "Makara": "Pola hias batik Makara terinspirasi dari makhluk mitologi dalam agama Hindu bernama Makara'. Makara memiliki bentuk unik berupa kombinasi belalai gajah, kepala singa, dan tubuh ikan, melambangkan perlindungan dan kekuatan. Selain dikenal sebagai simbol mitologi, Makara juga memiliki makna mendalam dalam budaya Sunda. Bagi masyarakat Sukabumi yang hidup berdampingan dengan laut, seperti di kawasan pantai Pelabuhan Ratu, Makara dipercaya dapat memahami dan melindungi manusia. Ketika seseorang merasa penat atau menghadapi kesulitan, berteriak di hadapan laut diyakini mampu memberikan rasa lega dan ketenangan hati. Makara menjadi simbol perlindungan, harmoni, dan hubungan erat manusia dengan elemen air, mengingatkan kita akan pentingnya menjaga keseimbangan alam sekaligus menghormati keajaiban yang ada di dalamnya.",
-    "Mandala Bagja": "Pola hias batik Mandala Bagja terinspirasi dari konsep ‘Mandala’, yang berasal dari Bahasa Sanskerta dan bermakna ‘lingkaran yang utuh’. Kata ‘Bagja’ sendiri diambil dari Bahasa Sunda, yang berarti ‘kebahagiaan’. Pola hias batik ini menjadian Mandala berbentuk lingkaran sebagai objek utama dengan makna filosofis yang mendalam. Mandala Bagja merepresentasikan perjalanan dan perputaran kehidupan manusia yang harmonis, diwarnai dengan rasa kebahagiaan sebagai tujuan utama serta memberikan keyakinan bahwa perputaran hidup manusia pasti akan berakhir indah. Pola hias ini menjadi sebuah harapan dan keyakinan bagi Masyarakat Sukabumi dalam menjalani kehidupan. ",
-    "Manuk Julang": "Pola hias batik Manuk Julang terinspirasi dari burung rangkong papan (Buceros Bicornis), satwa endemik asli Indonesia. Dalam bahasa Sunda, burung ini dikenal sebagai Manuk Julang. Spesies burung ini hingga kini mash dijaga di Pusat Penyelamatan Satwa Cikananga (PPSC) di Kecamatan Nyalingdung, Kabupaten Sukabumi. Manuk julang memiliki karakter pantang menyerah, terlihat dari kegigihannya saat terbang mencari sumber air atau makanan hingga berhasil mendapatkannya. Kegigihan burung ini menjadi inspirasi bagi bentuk ikat kepala 'julang ngapak', yang dikenakan oleh 'lengser' bijak yang menguasai ilmu pengetahuan dan berperan sebagai penasihat raja. Selain itu, symbol 'julang ngapak' (Burung julang dengan sayap yang terbentang) juga ditemukan pada atap rumah tradisional di Jawa Barat, melambangkan kekuatan dan perlindungan. Pola hias batik ini merepresentasikan nilai-nilai kegigihan, kebijaksanaan, dan harmoni yang erat kaitannya dengan budaya Sunda.",
-    "Masagi": "Pola hias batik Masagi terinspirasi dari filosofi kehidupan masyrakat di Jawa Barat tentang manusia paripurna Sunda yang seimbang, teguh, kokoh dalam berpikir, berucap dan berperilaku. Dalam Bahasa Sunda, ‘Masagi’ berarti ‘persegi’, yang melambangkan kesetaraan sisi dan menjadi symbol dari keseimbangan. Motif pada pola hias batik ini mencakup berbagai objek, seperti kendi (Monumenalun-alun Kota Sukabumi), unsur air, sayap manuk julang, biji/fuli pala, dan bunga Wijayakusuma. Setiap objek dalam pola hias batik Masagi memiliki makna yang erat kaitannya dengan harapan agar Masyarakat Sukabumi menjadi insan paripurna.",
-    "Mata Air Sukabumi": "Pola hias batik Mata Air Sukabumi terinspirasi dari kondisi geografis Sukabumi yang kaya akan sumber mata air. Air sebagai sumber kehidupan memiliki peran yang sangat penting bagi masyarakat Sunda, termasuk di Kota Sukabumi. Hal ini tercermin dari banyaknya nama tempat yang diawali dengan Tji atau Ci, yang dalam bahasa Sunda berarti cai atau air. Air tidak hanya mewakili unsur alam yang baik, tetapi juga menjadi simbol harapan, cita-cita, dan doa yang terus mengalir, melambangkan keberlanjutan dan kehidupan manusia.",
-    "Merak Kinanti": "Pola hias batik Merak Kinanti terinspirasi dari fauna endemic Pulau Jawa merak hijau (Pavo Muticus), salah satu hewan eksotis Indonesia. Kata ‘Kinanti’ diambil dari istilah dalam pupuh Sunda yang bermakna ‘kelak yang dinanti-nanti’ atau ‘yang di tunggu-tunggu’ Pada pola hias batik ini, merak digambarkan dalam posisi menunggu dengan sayap yang tidak terkepak, melambangkan kesabaran dan keyakinan bahwa keindahan akan datang pada waktunya sekaligus menjadi cerminan individu yang mampu menempatkan diri disegala situasi dan kondisi. Merak Kinanti tidak hanya merepresentasikan keindahan alam, tetapi juga menyampaikan pesan filosofis tentang harapan dan ketenangan dalam menghadapi perjalanan kehidupan.",
-    "Mozaik Kadudampit": "Pola hias batik Mozaik Kadudampit terinspirasi oleh bunga Kadudampit (Rhododendron Wilhelminae). Bunga ini merupakan jenis flora endemik Indonesia yang hanya tumbuh subur di ketinggian 1.350 mdpl, dapat ditemukan di Gunung Gede Pangrango serta Gunung Salak. Penamaan Rhododendron Wilhelminae sendiri berhubungan dengan kunjungan Ratu Wilhelmina ke Situ Gunung Kadudampit, Kabupaten Sukabumi. Mozaik Kadudampit memiliki latar belakang yang menampilkan pola mozaik atau pattern perupa garis-garis statis yang memberikan kesan harmonis pada desain. Makna mozaik pada pola hias batik merupakan metafora dari kumpulan informasi yang pengrajin dapat sehingga menghasilkan visual pola hias dengan latar belakang garis yang saling berhubungan. Melalui sola hias batik ini, diharapkan bunga Kadudampit dapat terus dilestarikan dan tumbuh dengar baik dengan subur, hal tersebut melambangkan ketahanan alam yang harus dijaga.",
-    "Nakamesta": "Pola hias batik Nekamesta merupakan merepresentasikan konsep multiverse dalam kaitannya lengan alam semesta yang terdiri atas tiga dimensi kehidupan: masa kini, masa lalu, dan masa depan. Pola hias batik ini menggambarkan pentingnya penguasaan diri dalam Buana Handap (dunia bawah), Buana Panca Tengah (dunia tengah), dan Buana Nyuncung (dunia atas), serta keberanian untuk menghadapi dan menyelaraskan ketiga dimensi tersebut demi menciptakan keseimbangan dan keharmonisan alam.",
-    "Pakwan": "Pola hias batik Pakwan terinspirasi dari pakis. Tanaman ini banyak ditemukan di Sukabumi, menandakan bahwa daerah tersebut sejak dahulu merupakan kawasan hutan hujan tropis (rainforest). Bentuk pohon pakis dengan daunnya yang bergelung melingkar ke dalam menyimpan makna filosofis tentang perjalanan hidup manusia. Pakis melambangkan proses ntrospeksi, dimana seseorang diajak untuk terlebih dahulu mengenal jati dirinya sebelum berinteraksi secara seimbang dengan sesama, alam, dan Sang Pencipta. Bentuknya yang melingkar ke dalam mencerminkan pentingnya evaluasi diri sebelum menilai atau memberikan solusi kepada orang lain. Selain itu, pertumbuhan pohon pakis yang terus menjulang ke atas tetapi daunnya semakin merunduk melambangkan sikap rendah hati manusia yang tidak melupakan asal-usulnya, serta kesadaran untuk selalu menghargai sesama dalam perjalanan menuju tujuan hidupnya. Dalam pengetahuan tradisional Sunda, pakis memiliki peranan penting sebagai penjaga kesehatan tanaman lain dalam sebuah ekosistem.",
-    "Palawan": "Pola hias batik Palawan terinspirasi oleh buah pala (Myristica fragrans Houtt) terutama pada bagian biji pala. Pala dalam bahasa Sanskerta memiliki kaitan erat dengan kata pahlawan. Phala-wan' berarti orang yang menghasilkan buah keberhasilan. Di daerah Sukabumi, pala merupakan salah satu hasil bumi yang menjadi komoditas utama. Batik Palawan menggambarkan makna filosofi tentang kesuksesan, keberhasilan, dan perjuangan hidup. Pola hias ini juga melambangkan kemakmuran dan keberuntungan, mengingat pala juga merupakan bahan rempah yang bernilai tinggi dalam perdagangan. Dalam konteks budaya Sunda, pala menjadi simbol kekayaan alam yang harus dijaga dan dilestarikan.",
-    "Penyu Sukabumian": "Pola hias batik Penyu Sukabumian terinspirasi dari penyu hijau (Chelonia Mydas), yang hidup di perairan pesisir Pelabuhan Ratu, Sukabumi. Penyu hijau merupakan satwa yang dilindungi dan memiliki makna penting dalam ekosistem laut. Pola hias ini mengajarkan tentang pentingnya menjaga kelestarian alam dan ekosistem laut. Penyu juga menjadi simbol kesabaran, keteguhan, dan perjalanan panjang dalam kehidupan. Dalam budaya lokal, penyu sering dikaitkan dengan perlindungan dan keberuntungan bagi para nelayan dan masyarakat pesisir.",
-    "Puyuh": "Pola hias batik Puyuh terinspirasi dari burung puyuh (Coturnix Coturnix), yang merupakan burung kecil dengan warna bulu yang unik dan menarik. Burung puyuh menjadi simbol ketelitian, kesederhanaan, dan kehati-hatian dalam menjalani kehidupan. Pola hias ini merepresentasikan nilai-nilai kehidupan sehari-hari yang harus dijalani dengan penuh perhatian dan kesungguhan. Burung puyuh juga dikenal dengan kebiasaan berkumpul dan bekerja sama dalam kelompok, melambangkan pentingnya solidaritas dan kebersamaan dalam masyarakat.",
-    "Rereng Gunung Parang": "Pola hias batik Rereng Gunung Parang terinspirasi dari struktur geologis Gunung Parang yang unik dan khas. Pola garis-garis yang tegas dan teratur dalam batik ini menggambarkan kestabilan, ketegasan, dan kekuatan alam. Gunung Parang sendiri merupakan ikon wisata alam di Sukabumi yang memiliki daya tarik tersendiri. Pola ini mengandung filosofi tentang keteguhan hati, ketegasan dalam mengambil keputusan, dan kemampuan bertahan dalam situasi sulit.",
-    "Rereng Tjaiwangi": "Pola hias batik Rereng Tjaiwangi merupakan pola garis-garis yang saling berhubungan dan membentuk motif yang dinamis. Pola ini melambangkan hubungan sosial yang erat, interaksi antar manusia, dan pentingnya kerja sama dalam kehidupan bermasyarakat. Rereng Tjaiwangi juga merepresentasikan perubahan dan perkembangan yang terus berlangsung, serta kemampuan beradaptasi dengan lingkungan sekitar.",
-    "Wijayakusumah": "Pola hias batik Wijayakusumah terinspirasi dari bunga wijayakusuma (Epiphyllum oxypetalum), yang dikenal dengan keindahannya dan keunikan mekarnya hanya pada malam hari. Bunga ini menjadi simbol keabadian, keindahan yang tersembunyi, dan misteri alam. Pola hias ini juga mengandung pesan tentang harapan, kesabaran, dan keyakinan bahwa keindahan akan muncul pada waktunya."
-}
+    return BackgroundModel(lambda: load_backend(model_dir=MODEL_DIR), warmup=warm_up)  # <-- Ganti ke folder SavedModel
+
+# Jika LOKATMALA_INFERENCE_URL diisi, inferensi dikirim ke inference_server.py
+# (micro-batching lintas sesi) dan model tidak dimuat di proses Streamlit.
+INFERENCE_URL = os.environ.get("LOKATMALA_INFERENCE_URL")
+
+model_loader = None if INFERENCE_URL else load_model()
+
+# -------------------- Cache Prediksi (Hash Gambar) --------------------
+@st.cache_resource
+def get_prediction_cache(backend_name):
+    return PredictionCache(
+        maxsize=int(os.environ.get("LOKATMALA_CACHE_SIZE", "256")),
+        ttl=float(os.environ.get("LOKATMALA_CACHE_TTL", "3600")),
+        persist_path=os.environ.get("LOKATMALA_CACHE_PATH") or None,
+        fingerprint=model_fingerprint(MODEL_DIR) + backend_name,
+    )
+
+# -------------------- Ekspor Metrik (Opsional) --------------------
+# /metrics format Prometheus jika LOKATMALA_METRICS_PORT diisi; file lewat LOKATMALA_METRICS_FILE
+@st.cache_resource
+def start_metrics_server():
+    metrics.start_file_exporter()
+    port = os.environ.get("LOKATMALA_METRICS_PORT")
+    return metrics.start_metrics_server(int(port)) if port else None
+
+start_metrics_server()
+
+# -------------------- Mode Akurasi Tinggi (Multi-Tile) --------------------
+# Batas tile & anggaran latensi memengaruhi hasil, jadi keduanya ikut kunci cache.
+TILE_MAX = int(os.environ.get("LOKATMALA_TILE_MAX", "24"))
+TILE_BUDGET_MS = float(os.environ.get("LOKATMALA_TILE_BUDGET_MS", "1500"))
 
 # -------------------- Layout Dua Kolom --------------------
 col1, col2 = st.columns(2)
@@ -171,18 +201,26 @@ with col1:
 
     input_method = st.radio("Pilih Metode:", ["Upload Gambar", "Ambil dari Kamera"])
 
+    # Mode multi-tile hanya untuk inferensi lokal (butuh batch langsung ke model)
+    high_accuracy = not INFERENCE_URL and st.checkbox(
+        "Mode akurasi tinggi",
+        help="Gambar dipotong menjadi beberapa bagian 224px dan diprediksi sekaligus. Lebih lambat, cocok untuk foto kain utuh.",
+    )
+
     from PIL import Image, UnidentifiedImageError
 
     image = None
+    image_bytes = None
+    trace = None
 
     if input_method == "Upload Gambar":
         uploaded_file = st.file_uploader("Unggah gambar batik (.png/ lokatmala.png)", type=["png", "jpeg", "jpg"])
         if uploaded_file is not None:
+            trace = metrics.RequestTrace(source="upload")
             try:
-                image = Image.open(uploaded_file)
-                image.verify()  # Validasi image
-                uploaded_file.seek(0)  # Reset pointer setelah verify
-                image = Image.open(uploaded_file)  # reload image setelah verify
+                with trace.span("decode"):
+                    image_bytes = uploaded_file.getvalue()
+                    image = load_image(image_bytes)  # validasi + decode sekali, langsung ke skala kecil
             except UnidentifiedImageError:
                 st.error("File yang diunggah bukan gambar yang valid.")
                 image = None
@@ -192,11 +230,11 @@ with col1:
     else:
         camera_image = st.camera_input("Ambil gambar dari kamera")
         if camera_image is not None:
+            trace = metrics.RequestTrace(source="camera")
             try:
-                image = Image.open(camera_image)
-                image.verify()
-                camera_image.seek(0)
-                image = Image.open(camera_image)
+                with trace.span("decode"):
+                    image_bytes = camera_image.getvalue()
+                    image = load_image(image_bytes)
             except UnidentifiedImageError:
                 st.error("Gambar kamera tidak valid.")
                 image = None
@@ -206,44 +244,120 @@ with col1:
 
     # **Pindahkan st.image ke dalam col1, agar gambar hanya di kolom 1**
     if image is not None:
-        st.image(image, caption="Gambar telah di identifikasi", use_column_width=True)
+        # Tampilkan byte asli (resolusi penuh) tanpa encode ulang di server
+        st.image(image_bytes, caption="Gambar telah di identifikasi", use_column_width=True)
 
 with col2:
     st.subheader("Hasil Prediksi")
 
+    prediction = None
     if image:
-        img_resized = image.resize((224, 224))
-        img_array = np.array(img_resized) / 255.0
-        img_array = img_array.astype(np.float32)  # pastikan float32
-        img_array = np.expand_dims(img_array, axis=0)
-        input_tensor = tf.convert_to_tensor(img_array)
-        
-        outputs = infer(input_tensor)
-        prediction = list(outputs.values())[0].numpy()
-        
+        if INFERENCE_URL:
+            model = None
+            use_embedding = False
+            prediction_cache = get_prediction_cache(INFERENCE_URL)
+        else:
+            try:
+                if not model_loader.ready:
+                    with st.spinner("Model sedang disiapkan..."):
+                        model_loader.get()
+                model = model_loader.get()
+            except Exception as e:
+                # Jangan simpan loader yang gagal di cache_resource; rerun berikutnya mencoba lagi
+                load_model.clear()
+                st.error(f"Model gagal dimuat: {e}")
+                trace.finish(error="load_model")  # hentikan profiler sebelum st.stop()
+                st.stop()
+            use_embedding = uses_embedding(model)
+            if embedding_index is not None and not use_embedding:
+                index_problem = getattr(model, "embedding_error", f"backend {model.name} tidak menghasilkan embedding")
+            prediction_cache = get_prediction_cache(model.name + ("+embedding" if use_embedding else ""))
+
+        run_info = {}
+
+        def run_inference():
+            run_info["computed"] = True
+            if INFERENCE_URL:
+                with trace.span("infer"):
+                    result = predict_remote(INFERENCE_URL, image_bytes)
+                return np.array([result["probabilities"]], dtype=np.float32), None
+            if high_accuracy:
+                with trace.span("infer_tiled"):
+                    prediction, tile_info = predict_tiled(
+                        model.predict, image_bytes, max_tiles=TILE_MAX, max_latency=TILE_BUDGET_MS / 1000
+                    )
+                run_info["tiles"] = tile_info
+                return prediction, None
+            with trace.span("resize"):
+                img_resized = resize_image(image)
+            with trace.span("to_array"):
+                img_array = np.empty((1, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+                preprocess_image(img_resized, out=img_array[0])
+            with trace.span("infer"):
+                if use_embedding:
+                    return model.predict_with_embedding(img_array)
+                return model.predict(img_array), None
+
+        # Rerun karena interaksi UI pada gambar yang sama tidak perlu inferensi ulang
+        try:
+            prediction, embedding = prediction_cache.get_or_compute(
+                image_bytes, run_inference, variant=f"tiled:{TILE_MAX}:{TILE_BUDGET_MS:g}" if high_accuracy else ""
+            )
+        except (OSError, ValueError) as e:
+            # URLError/HTTPError/timeout (turunan OSError) atau balasan JSON rusak
+            if not INFERENCE_URL:
+                raise
+            st.error(f"Layanan inferensi tidak dapat dihubungi: {e}")
+
+    if prediction is not None:
         predicted_class = class_names[np.argmax(prediction)]
         confidence = np.max(prediction) * 100
         filosofi = filosofi_dict.get(predicted_class, "Filosofi tidak ditemukan.")
 
-        st.markdown(f"<div style='font-size: 1.2em;'><strong>Motif Terdeteksi:</strong> {predicted_class}</div>", unsafe_allow_html=True)
-        st.markdown(f"<div style='font-size: 1em; color: gray;'><strong>Tingkat Keyakinan:</strong> {confidence:.2f}%</div>", unsafe_allow_html=True)
-
-        if confidence < 70:
-            st.warning(
-                "⚠️ Keyakinan rendah. Silakan coba ulang dengan gambar yang lebih baik, dengan memperhatikan spesifikasi sebagai berikut:\n"
-                "- Gunakan gambar batik yang fokus dan jelas.\n"
-                "- Hindari kain terlipat atau kusut.\n"
-                "- Jangan gunakan latar belakang yang ramai.\n"
-                "- Ambil gambar dari jarak sedang, tidak terlalu dekat atau jauh.\n"
-                "- Pastikan pencahayaan cukup dan merata."
-            )
-        st.markdown("<hr style='margin-top: 20px; margin-bottom: 10px;'>", unsafe_allow_html=True)
-        st.markdown(f"<div style='text-align: justify; font-size: 0.95em; line-height: 1.7;'><strong>Filosofi Motif:</strong><br>{filosofi}</div>", unsafe_allow_html=True)
-    else:
+        with trace.span("render"):
+            st.markdown(f"<div style='font-size: 1.2em;'><strong>Motif Terdeteksi:</strong> {predicted_class}</div>", unsafe_allow_html=True)
+            st.markdown(f"<div style='font-size: 1em; color: gray;'><strong>Tingkat Keyakinan:</strong> {confidence:.2f}%</div>", unsafe_allow_html=True)
+
+            if confidence < 70:
+                st.warning(
+                    "⚠️ Keyakinan rendah. Silakan coba ulang dengan gambar yang lebih baik, dengan memperhatikan spesifikasi sebagai berikut:\n"
+                    "- Gunakan gambar batik yang fokus dan jelas.\n"
+                    "- Hindari kain terlipat atau kusut.\n"
+                    "- Jangan gunakan latar belakang yang ramai.\n"
+                    "- Ambil gambar dari jarak sedang, tidak terlalu dekat atau jauh.\n"
+                    "- Pastikan pencahayaan cukup dan merata."
+                )
+            st.markdown("<hr style='margin-top: 20px; margin-bottom: 10px;'>", unsafe_allow_html=True)
+            st.markdown(f"<div style='text-align: justify; font-size: 0.95em; line-height: 1.7;'><strong>Filosofi Motif:</strong><br>{filosofi}</div>", unsafe_allow_html=True)
+        similar = []
+        if embedding is not None and embedding.shape[-1] != embedding_index.dim:
+            index_problem = f"dimensi embedding model ({embedding.shape[-1]}) tidak sama dengan indeks ({embedding_index.dim})"
+        elif embedding is not None:
+            with trace.span("similar"):
+                similar = embedding_index.search(embedding[0], k=5)
+        if index_problem and not INFERENCE_URL:
+            st.warning(f"Motif serupa tidak ditampilkan: {index_problem}")
+        if similar:
+            st.markdown("<hr style='margin-top: 20px; margin-bottom: 10px;'>", unsafe_allow_html=True)
+            st.markdown("<strong>Motif Serupa di Katalog:</strong>", unsafe_allow_html=True)
+            shown = [hit for hit in similar if os.path.exists(hit["path"])]
+            if shown:
+                st.image([hit["path"] for hit in shown], width=120,
+                         caption=[f"{hit['label']} ({hit['score']:.0%})" for hit in shown])
+        tile_info = run_info.get("tiles")
+        if tile_info:
+            st.caption(f"Mode akurasi tinggi: {tile_info['tiles']} bagian dalam {tile_info['elapsed_s']:.2f} detik")
+        cache_stats = prediction_cache.stats()
+        st.caption(f"Cache prediksi: {cache_stats['hits']} hit / {cache_stats['misses']} miss ({cache_stats['hit_rate']:.0%})")
+        trace.finish(predicted_class, confidence, cached="computed" not in run_info)
+    elif not image:
         st.info("Silakan unggah atau ambil gambar terlebih dahulu.")
 
 # -------------------- Footer --------------------
 st.markdown("""<div class="footer">© 2025 Arsyika Ma'rifatika</div>""", unsafe_allow_html=True)
 
+if model_loader is not None:
+    model_loader.mark("first_paint_s")  # hanya tercatat pada render pertama
+
 
 
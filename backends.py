@@ -0,0 +1,152 @@
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+from lokatmala import MODEL_DIR, build_embedding_infer, get_infer, load_model, run_embedding_infer, run_infer
+from prediction_cache import model_fingerprint
+
+# -------------------- Backend Inferensi --------------------
+# Semua backend punya predict(batch) → array softmax (N, 20), sehingga app.py,
+# batch_classify.py dan inference_server.py tidak perlu tahu model apa yang
+# berjalan. Backend dengan supports_embedding = True juga punya
+# predict_with_embedding(batch) untuk indeks kemiripan (embedding_index.py). Varian TFLite hanya dipakai jika laporan
+# paritas dari export_tflite.py menyatakan lulus untuk SavedModel yang sedang
+# dipakai.
+
+TFLITE_DIR = "Lokatmala_tflite"
+PARITY_REPORT = "parity.json"
+TFLITE_VARIANTS = {
+    "tflite-fp16": "model_fp16.tflite",
+    "tflite-int8": "model_int8.tflite",
+}
+BACKENDS = ("savedmodel", *TFLITE_VARIANTS)
+
+
+class SavedModelBackend:
+    name = "savedmodel"
+    supports_embedding = True
+
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model = load_model(model_dir)
+        self.infer = get_infer(self.model)
+        self._embedding_infer = None
+
+    def predict(self, batch):
+        return run_infer(self.infer, batch)
+
+    def predict_with_embedding(self, batch):
+        if self._embedding_infer is None:
+            self._embedding_infer = build_embedding_infer(self.model)
+        return run_embedding_infer(self._embedding_infer, batch)
+
+
+def _tflite_interpreter(model_path, num_threads=None):
+    try:
+        from tflite_runtime.interpreter import Interpreter  # runtime ringan, tanpa TF penuh
+    except ImportError:
+        import tensorflow as tf
+
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=model_path, num_threads=num_threads)
+
+
+class TFLiteBackend:
+    supports_embedding = False  # model TFLite hanya mengekspor output softmax
+
+    def __init__(self, model_path, name="tflite", num_threads=None):
+        self.name = name
+        self.interpreter = _tflite_interpreter(model_path, num_threads=num_threads or os.cpu_count())
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self._batch_size = None
+        self._lock = threading.Lock()  # interpreter TFLite tidak thread-safe
+
+    def _resize(self, batch_size):
+        if batch_size != self._batch_size:
+            shape = [batch_size, *self.input_detail["shape"][1:]]
+            self.interpreter.resize_tensor_input(self.input_detail["index"], shape)
+            self.interpreter.allocate_tensors()
+            self.input_detail = self.interpreter.get_input_details()[0]
+            self.output_detail = self.interpreter.get_output_details()[0]
+            self._batch_size = batch_size
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            self._resize(len(batch))
+            dtype = self.input_detail["dtype"]
+            if dtype != np.float32:
+                # Model int8 penuh: kuantisasi input sesuai scale/zero point
+                scale, zero_point = self.input_detail["quantization"]
+                info = np.iinfo(dtype)
+                batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+            self.interpreter.set_tensor(self.input_detail["index"], batch)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output_detail["index"])
+            if output.dtype != np.float32:
+                scale, zero_point = self.output_detail["quantization"]
+                output = (output.astype(np.float32) - zero_point) * scale
+            return output.copy()
+
+
+# -------------------- Uji Paritas --------------------
+def check_parity(candidate, reference, images, batch_size=16):
+    agree = 0
+    max_drift = 0.0
+    for start in range(0, len(images), batch_size):
+        batch = np.asarray(images[start:start + batch_size], dtype=np.float32)
+        expected = reference.predict(batch)
+        actual = candidate.predict(batch)
+        agree += int(np.sum(np.argmax(expected, axis=1) == np.argmax(actual, axis=1)))
+        max_drift = max(max_drift, float(np.max(np.abs(expected - actual))))
+    total = len(images)
+    return {
+        "num_images": total,
+        "top1_agreement": agree / total if total else 0.0,
+        "max_confidence_drift": max_drift,
+    }
+
+
+def parity_passed(result, min_agreement=1.0, max_drift=0.05):
+    return (
+        result["num_images"] > 0
+        and result["top1_agreement"] >= min_agreement
+        and result["max_confidence_drift"] <= max_drift
+    )
+
+
+def read_parity_report(tflite_dir=TFLITE_DIR):
+    try:
+        with open(os.path.join(tflite_dir, PARITY_REPORT), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# -------------------- Pemilih Backend --------------------
+def load_backend(name=None, model_dir=MODEL_DIR, tflite_dir=TFLITE_DIR):
+    name = name or os.environ.get("LOKATMALA_BACKEND", "savedmodel")
+    if name == "savedmodel":
+        return SavedModelBackend(model_dir)
+    if name not in TFLITE_VARIANTS:
+        raise ValueError(f"Backend tidak dikenal: {name} (pilihan: {', '.join(BACKENDS)})")
+
+    entry = read_parity_report(tflite_dir).get(name)
+    if not entry:
+        reason = "belum ada laporan paritas"
+    elif entry.get("model_fingerprint") != model_fingerprint(model_dir):
+        reason = "laporan paritas dibuat untuk SavedModel lain"
+    elif not entry.get("passed"):
+        reason = (
+            f"paritas gagal (top-1 {entry['top1_agreement']:.2%}, "
+            f"drift maks {entry['max_confidence_drift']:.4f})"
+        )
+    else:
+        return TFLiteBackend(os.path.join(tflite_dir, TFLITE_VARIANTS[name]), name=name)
+
+    # Jangan beralih diam-diam ke backend yang bisa mengubah kelas prediksi
+    print(f"Backend {name} tidak dipakai: {reason}. Kembali ke savedmodel.", file=sys.stderr)
+    return SavedModelBackend(model_dir)
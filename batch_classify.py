@@ -0,0 +1,227 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import multiprocessing
+import time
+from collections import deque
+
+import numpy as np
+
+from backends import BACKENDS, load_backend
+from lokatmala import IMG_SIZE, MODEL_DIR, filosofi_dict, load_pixels, normalize, top_k
+
+# -------------------- Klasifikasi Batch Tanpa Streamlit --------------------
+# Contoh:
+#   python batch_classify.py katalog/ -o hasil.jsonl --batch-size 32 --workers 4
+#   python batch_classify.py manifest.txt -o hasil.csv --resume
+#
+# Decode dan resize berjalan di pool proses (hasil uint8 agar IPC 4x lebih
+# kecil), sedangkan proses utama menormalkan ke float32 dan mengumpulkan batch
+# berukuran tetap untuk model. Pool memakai konteks "spawn" dan dibuat sebelum
+# model dimuat, sehingga tidak ada fork dari proses yang thread TF-nya aktif.
+# Jumlah decode yang boleh mendahului inferensi dibatasi (workers x batch)
+# agar memori tidak tumbuh saat decode lebih cepat dari model.
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+def list_images(source):
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(root, name))
+        return sorted(paths)
+
+    # Manifest: satu path per baris (atau kolom "path" jika berupa CSV).
+    # Path relatif dihitung dari folder manifest, apa pun formatnya.
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, newline="", encoding="utf-8") as f:
+        if source.lower().endswith(".csv"):
+            entries = [row["path"].strip() for row in csv.DictReader(f) if row.get("path")]
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+    return [path if os.path.isabs(path) else os.path.join(base, path) for path in entries]
+
+
+def decode_image(path):
+    try:
+        return path, load_pixels(path), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+
+# -------------------- Output (CSV / JSONL) --------------------
+def output_format(path):
+    return "jsonl" if path.lower().endswith((".jsonl", ".json")) else "csv"
+
+
+def _drop_partial_line(path):
+    # Baris terakhir bisa terpotong jika proses sebelumnya crash
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def completed_paths(path, fmt):
+    if not os.path.exists(path):
+        return set()
+    _drop_partial_line(path)
+    done = set()
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "jsonl":
+            for line in f:
+                try:
+                    done.add(json.loads(line)["path"])
+                except (ValueError, KeyError):
+                    continue
+        else:
+            for row in csv.DictReader(f):
+                done.add(row["path"])
+    return done
+
+
+class ResultWriter:
+    def __init__(self, path, fmt, k, with_filosofi, append):
+        self.fmt = fmt
+        self.fieldnames = ["path", "error"]
+        for i in range(1, k + 1):
+            self.fieldnames += [f"class_{i}", f"confidence_{i}"]
+        if with_filosofi:
+            self.fieldnames.append("filosofi")
+        self.with_filosofi = with_filosofi
+        write_header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+        self.file = open(path, "a" if append else "w", newline="", encoding="utf-8")
+        if fmt == "csv":
+            self.csv = csv.DictWriter(self.file, fieldnames=self.fieldnames)
+            if write_header:
+                self.csv.writeheader()
+
+    def write(self, path, ranked=None, error=None):
+        if self.fmt == "jsonl":
+            row = {"path": path, "error": error, "top_k": []}
+            if ranked:
+                row["top_k"] = [{"class": name, "confidence": conf} for name, conf in ranked]
+                if self.with_filosofi:
+                    row["filosofi"] = filosofi_dict.get(ranked[0][0], "Filosofi tidak ditemukan.")
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        else:
+            row = {"path": path, "error": error or ""}
+            for i, (name, conf) in enumerate(ranked or [], start=1):
+                row[f"class_{i}"] = name
+                row[f"confidence_{i}"] = f"{conf:.6f}"
+            if ranked and self.with_filosofi:
+                row["filosofi"] = filosofi_dict.get(ranked[0][0], "Filosofi tidak ditemukan.")
+            self.csv.writerow(row)
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+# -------------------- Loop Utama --------------------
+def classify(paths, writer, model_dir=MODEL_DIR, batch_size=32, workers=None, k=3, report_every=10.0, backend=None):
+    workers = workers or os.cpu_count() or 1
+    pool = multiprocessing.get_context("spawn").Pool(processes=workers)
+    try:
+        backend = load_backend(backend, model_dir=model_dir)
+        return _classify(pool, paths, writer, backend, batch_size, workers * batch_size, k, report_every)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _classify(pool, paths, writer, backend, batch_size, window, k, report_every):
+    processed = 0
+    start = last_report = time.perf_counter()
+
+    batch = np.empty((batch_size, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+    batch_paths = []
+
+    def flush_batch():
+        nonlocal processed
+        if not batch_paths:
+            return
+        predictions = backend.predict(batch[: len(batch_paths)])
+        for path, prediction in zip(batch_paths, predictions):
+            writer.write(path, ranked=top_k(prediction, k))
+        writer.flush()  # setiap batch tersimpan → bisa dilanjutkan dengan --resume
+        processed += len(batch_paths)
+        batch_paths.clear()
+
+    remaining = iter(paths)
+    pending = deque()
+
+    def refill():
+        while len(pending) < window:
+            path = next(remaining, None)
+            if path is None:
+                return
+            pending.append(pool.apply_async(decode_image, (path,)))
+
+    refill()
+    while pending:
+        path, pixels, error = pending.popleft().get()
+        refill()
+        if error is not None:
+            writer.write(path, error=error)
+            processed += 1
+            continue
+        normalize(pixels, out=batch[len(batch_paths)])
+        batch_paths.append(path)
+        if len(batch_paths) == batch_size:
+            flush_batch()
+        now = time.perf_counter()
+        if now - last_report >= report_every:
+            rate = processed / (now - start)
+            print(f"{processed}/{len(paths)} gambar, {rate:.1f} gambar/detik", file=sys.stderr)
+            last_report = now
+    flush_batch()
+
+    elapsed = time.perf_counter() - start
+    return processed, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Klasifikasi motif batik Lokatmala secara batch.")
+    parser.add_argument("source", help="Folder gambar atau file manifest (.txt / .csv dengan kolom path)")
+    parser.add_argument("-o", "--output", required=True, help="File hasil (.csv atau .jsonl)")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--backend", choices=BACKENDS, help="Default: LOKATMALA_BACKEND atau savedmodel")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses decode (default: jumlah CPU)")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--filosofi", action="store_true", help="Sertakan filosofi motif teratas")
+    parser.add_argument("--resume", action="store_true", help="Lewati gambar yang sudah ada di file hasil")
+    args = parser.parse_args(argv)
+
+    fmt = output_format(args.output)
+    paths = list_images(args.source)
+    if args.resume:
+        done = completed_paths(args.output, fmt)
+        paths = [p for p in paths if p not in done]
+        print(f"Melanjutkan: {len(done)} gambar sudah selesai, {len(paths)} tersisa", file=sys.stderr)
+
+    writer = ResultWriter(args.output, fmt, args.top_k, args.filosofi, append=args.resume)
+    try:
+        processed, elapsed = classify(
+            paths, writer, model_dir=args.model_dir, batch_size=args.batch_size,
+            workers=args.workers, k=args.top_k, backend=args.backend,
+        )
+    finally:
+        writer.close()
+
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    print(f"Selesai: {processed} gambar dalam {elapsed:.1f} detik ({rate:.1f} gambar/detik)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from backends import BACKENDS, load_backend
+from batch_classify import list_images
+from inference_server import format_prediction
+from lokatmala import IMG_SIZE, MODEL_DIR, load_image, preprocess_image
+from preprocessing import peak_rss_mb
+
+# -------------------- Benchmark decode → preprocess → infer → render --------------------
+# Contoh:
+#   python benchmark.py --output baseline.json
+#   python benchmark.py --compare baseline.json --threshold 0.10
+#
+# Berjalan tanpa browser/jaringan. Gambar sintetis dibuat deterministik di
+# proses terpisah dan disimpan ke --inputs-dir, sehingga array float64 saat
+# pembuatannya tidak ikut terhitung di peak RSS. Gambar sampel bisa ditambahkan
+# lewat --samples. Semua metrik disimpan datar ("<tahap>.<gambar>.<statistik>")
+# agar mudah dibandingkan antar commit.
+
+BATCH_SIZES = (1, 8, 32)
+INPUTS_DIR = os.path.join(tempfile.gettempdir(), "lokatmala_benchmark_inputs")
+SYNTHETIC_INPUTS = ("camera_jpeg.jpg", "12mp_jpeg.jpg", "alpha_png.png")
+
+# Arah perbaikan per akhiran metrik: lebih kecil lebih baik, kecuali _ips
+LOWER_IS_BETTER = ("_ms", "_s", "_mb")
+HIGHER_IS_BETTER = ("_ips",)
+# p99 hanya dilaporkan; dengan sampel terbatas nilainya hampir sama dengan maksimum
+REPORT_ONLY = (".p99_ms",)
+
+
+def synthetic_batik(width, height, seed=0):
+    # Pola berulang bergaya batik (sinus + kawung) agar JPEG tidak terlalu mudah dikompres
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    period = max(width, height) / 24
+    pattern = np.sin(x / period * np.pi) * np.cos(y / period * np.pi)
+    rings = np.cos(np.hypot((x % (2 * period)) - period, (y % (2 * period)) - period) / period * 4)
+    base = (pattern + rings) * 0.25 + 0.5
+    noise = rng.normal(0, 0.03, size=(height, width))
+    red = np.clip(base * 0.6 + 0.3 + noise, 0, 1)
+    green = np.clip(base * 0.3 + noise, 0, 1)
+    blue = np.clip(base * 0.15 + noise, 0, 1)
+    return (np.stack([red, green, blue], axis=-1) * 255).astype(np.uint8)
+
+
+def _encode(array, fmt, **params):
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+def _synthetic(filename):
+    if filename == "camera_jpeg.jpg":
+        return _encode(synthetic_batik(1280, 720, seed=1), "JPEG", quality=90)
+    if filename == "12mp_jpeg.jpg":
+        return _encode(synthetic_batik(4000, 3000, seed=2), "JPEG", quality=90)
+    rgba = synthetic_batik(1024, 1024, seed=3)
+    alpha = np.full(rgba.shape[:2] + (1,), 255, dtype=np.uint8)
+    alpha[:128] = 0  # pinggiran transparan
+    return _encode(np.concatenate([rgba, alpha], axis=-1), "PNG")
+
+
+def write_inputs(inputs_dir=INPUTS_DIR):
+    os.makedirs(inputs_dir, exist_ok=True)
+    for filename in SYNTHETIC_INPUTS:
+        path = os.path.join(inputs_dir, filename)
+        if not os.path.exists(path):
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(_synthetic(filename))
+            os.replace(f"{path}.tmp", path)
+
+
+def build_inputs(samples_dir=None, inputs_dir=INPUTS_DIR):
+    # Pembuatan gambar sintetis dijalankan di proses anak; di sini hanya membaca byte-nya
+    cmd = [sys.executable, os.path.abspath(__file__), "--write-inputs", inputs_dir]
+    subprocess.run(cmd, check=True)
+    inputs = {}
+    for filename in SYNTHETIC_INPUTS:
+        with open(os.path.join(inputs_dir, filename), "rb") as f:
+            inputs[os.path.splitext(filename)[0]] = f.read()
+
+    if samples_dir:
+        for path in list_images(samples_dir):
+            name = "sample_" + os.path.splitext(os.path.basename(path))[0].replace(" ", "_")
+            with open(path, "rb") as f:
+                inputs[name] = f.read()
+    return inputs
+
+
+def _percentiles(prefix, timings_ms, metrics):
+    timings_ms = np.asarray(timings_ms)
+    metrics[f"{prefix}.p50_ms"] = float(np.percentile(timings_ms, 50))
+    metrics[f"{prefix}.p95_ms"] = float(np.percentile(timings_ms, 95))
+    metrics[f"{prefix}.p99_ms"] = float(np.percentile(timings_ms, 99))
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+# -------------------- Jalankan Benchmark --------------------
+def run(model_dir=MODEL_DIR, backend_name=None, samples_dir=None, repeat=200, throughput_rounds=5,
+        inputs_dir=INPUTS_DIR):
+    inputs = build_inputs(samples_dir, inputs_dir)
+    metrics = {}
+
+    start = time.perf_counter()
+    backend = load_backend(backend_name, model_dir=model_dir)
+    metrics["model.load_s"] = time.perf_counter() - start
+    warmup_batch = np.zeros((1, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+    _, metrics["model.first_infer_ms"] = _timed(backend.predict, warmup_batch)
+
+    img_array = np.empty((1, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+    for name, data in inputs.items():
+        stages = {"decode": [], "preprocess": [], "infer": [], "render": [], "total": []}
+        for _ in range(repeat):
+            image, t_decode = _timed(load_image, data)
+            _, t_pre = _timed(preprocess_image, image, img_array[0])
+            prediction, t_infer = _timed(backend.predict, img_array)
+            _, t_render = _timed(format_prediction, prediction[0])
+            for stage, value in zip(stages, (t_decode, t_pre, t_infer, t_render)):
+                stages[stage].append(value)
+            stages["total"].append(t_decode + t_pre + t_infer + t_render)
+        for stage, timings in stages.items():
+            _percentiles(f"{stage}.{name}", timings, metrics)
+
+    rng = np.random.default_rng(0)
+    for batch_size in BATCH_SIZES:
+        batch = rng.random((batch_size, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+        backend.predict(batch)  # tracing untuk ukuran batch baru tidak ikut diukur
+        start = time.perf_counter()
+        for _ in range(throughput_rounds):
+            backend.predict(batch)
+        elapsed = time.perf_counter() - start
+        metrics[f"throughput.batch_{batch_size}_ips"] = batch_size * throughput_rounds / elapsed
+
+    metrics["memory.peak_rss_mb"] = peak_rss_mb()
+    return {
+        "meta": {
+            "backend": backend.name,
+            "model_dir": model_dir,
+            "inputs": sorted(inputs),
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "metrics": metrics,
+    }
+
+
+# -------------------- Bandingkan dengan Baseline --------------------
+def compare(baseline, current, threshold=0.10):
+    regressions = []
+    for key, old in baseline["metrics"].items():
+        new = current["metrics"].get(key)
+        if new is None or not old or key.endswith(REPORT_ONLY):
+            continue
+        change = (new - old) / old
+        if key.endswith(HIGHER_IS_BETTER):
+            change = -change
+        elif not key.endswith(LOWER_IS_BETTER):
+            continue
+        if change > threshold:
+            regressions.append((key, old, new, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark alur prediksi Lokatmala.")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--backend", choices=BACKENDS, help="Default: LOKATMALA_BACKEND atau savedmodel")
+    parser.add_argument("--samples", help="Folder gambar batik sampel tambahan")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--throughput-rounds", type=int, default=5)
+    parser.add_argument("--output", help="Simpan hasil sebagai JSON (baseline)")
+    parser.add_argument("--compare", help="File baseline JSON untuk dibandingkan")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Regresi relatif maksimal (0.10 = 10%%)")
+    parser.add_argument("--inputs-dir", default=INPUTS_DIR, help="Folder cache gambar sintetis")
+    parser.add_argument("--write-inputs", metavar="DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.write_inputs:
+        write_inputs(args.write_inputs)
+        return
+
+    result = run(args.model_dir, args.backend, args.samples, args.repeat, args.throughput_rounds, args.inputs_dir)
+    for key, value in sorted(result["metrics"].items()):
+        print(f"{key:<45} {value:12.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, result, args.threshold)
+        for key, old, new, change in regressions:
+            print(f"REGRESI {key}: {old:.3f} → {new:.3f} ({change:+.1%})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"Tidak ada regresi di atas {args.threshold:.0%}.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
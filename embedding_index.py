@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+from backends import SavedModelBackend
+from batch_classify import list_images
+from lokatmala import IMG_SIZE, MODEL_DIR, class_names, load_and_preprocess
+from prediction_cache import model_fingerprint
+
+# -------------------- Indeks Kemiripan Motif (Embedding) --------------------
+# Contoh:
+#   python embedding_index.py build katalog/ --index Lokatmala_index
+#   python embedding_index.py add katalog_baru/ --index Lokatmala_index
+#   python embedding_index.py query foto.jpg --index Lokatmala_index -k 5
+#
+# Embedding penultimate dinormalisasi L2 lalu disimpan sebagai float16 mentah
+# (vectors.f16). Saat indeks dibuka, vektor disalin sekali ke array float32
+# berorientasi kolom (dim x jumlah) sehingga satu query = satu sgemv tanpa
+# konversi per pencarian. Penambahan cukup menulis di akhir file; index.json
+# mencatat jumlah baris & ukuran meta.jsonl yang sah, sehingga penulisan yang
+# terputus tidak merusak indeks dan tidak perlu membaca ulang seluruh file.
+
+INDEX_DIR = "Lokatmala_index"
+VECTORS_FILE = "vectors.f16"
+META_FILE = "meta.jsonl"
+INFO_FILE = "index.json"
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingIndex:
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = index_dir
+        self.dim = None
+        self.count = 0
+        self.fingerprint = None
+        self.meta = []
+        self._meta_bytes = 0
+        self._vectors = None  # float32 (dim, kapasitas); hanya kolom [:count] yang sah
+        self._info_mtime = None
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    @property
+    def exists(self):
+        return os.path.exists(self._path(INFO_FILE))
+
+    def refresh(self):
+        # Muat ulang jika proses lain menambah entri sejak terakhir dibuka
+        try:
+            mtime = os.path.getmtime(self._path(INFO_FILE))
+        except OSError:
+            return
+        if mtime == self._info_mtime:
+            return
+        with open(self._path(INFO_FILE), encoding="utf-8") as f:
+            info = json.load(f)
+        count, dim = info["count"], info["dim"]
+        with open(self._path(META_FILE), "rb") as f:
+            if "meta_bytes" in info:
+                lines = f.read(info["meta_bytes"]).splitlines(keepends=True)
+            else:
+                lines = [line for _, line in zip(range(count), f)]  # indeks format lama
+        meta = [json.loads(line) for line in lines]
+        vectors = None
+        if count:
+            raw = np.fromfile(self._path(VECTORS_FILE), dtype=np.float16, count=count * dim)
+            vectors = np.empty((dim, count), dtype=np.float32)
+            vectors[:] = raw.reshape(count, dim).T
+        with self._lock:
+            self.dim, self.count, self.fingerprint = dim, count, info.get("model_fingerprint")
+            self.meta, self._meta_bytes = meta, sum(len(line) for line in lines)
+            self._vectors, self._info_mtime = vectors, mtime
+
+    def _grow(self, embeddings):
+        # Kapasitas digandakan agar build bertahap tetap O(N), bukan menyalin ulang setiap batch
+        needed = self.count + len(embeddings)
+        vectors = self._vectors
+        if vectors is None or needed > vectors.shape[1]:
+            capacity = max(needed, 2 * (0 if vectors is None else vectors.shape[1]))
+            grown = np.empty((embeddings.shape[1], capacity), dtype=np.float32)
+            if vectors is not None:
+                grown[:, : self.count] = vectors[:, : self.count]
+            vectors = grown
+        vectors[:, self.count:needed] = embeddings.T
+        return vectors
+
+    def add(self, embeddings, metadata, fingerprint=None):
+        embeddings = normalize(embeddings).astype(np.float16)
+        if len(embeddings) != len(metadata):
+            raise ValueError("Jumlah embedding dan metadata harus sama.")
+        if self.dim is not None and embeddings.shape[1] != self.dim:
+            raise ValueError(f"Dimensi embedding {embeddings.shape[1]} tidak sama dengan indeks ({self.dim}).")
+        if self.fingerprint and fingerprint and fingerprint != self.fingerprint:
+            raise ValueError("Indeks dibuat dengan model lain; bangun ulang dengan 'build'.")
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        # Buang sisa penulisan yang terputus sebelum menambah di akhir file
+        for name, keep in ((VECTORS_FILE, self.count * (self.dim or 0) * 2), (META_FILE, self._meta_bytes)):
+            path = self._path(name)
+            if os.path.exists(path):
+                with open(path, "rb+") as f:
+                    f.truncate(keep)
+
+        lines = b"".join(json.dumps(item, ensure_ascii=False).encode("utf-8") + b"\n" for item in metadata)
+        for name, data in ((VECTORS_FILE, embeddings.tobytes()), (META_FILE, lines)):
+            with open(self._path(name), "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        info = {
+            "dim": int(embeddings.shape[1]),
+            "count": self.count + len(embeddings),
+            "meta_bytes": self._meta_bytes + len(lines),
+            "dtype": "float16",
+            "model_fingerprint": fingerprint or self.fingerprint,
+        }
+        tmp_path = self._path(INFO_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2)
+        os.replace(tmp_path, self._path(INFO_FILE))
+
+        # Perbarui salinan di memori tanpa membaca ulang file
+        vectors = self._grow(embeddings.astype(np.float32))
+        with self._lock:
+            self.meta = self.meta + list(metadata)
+            self._vectors, self._meta_bytes = vectors, info["meta_bytes"]
+            self.dim, self.count, self.fingerprint = info["dim"], info["count"], info["model_fingerprint"]
+            self._info_mtime = os.path.getmtime(self._path(INFO_FILE))
+
+    def search(self, query, k=5):
+        if k <= 0:
+            return []
+        self.refresh()
+        with self._lock:
+            vectors, meta, count = self._vectors, self.meta, self.count
+        if vectors is None or count == 0:
+            return []
+        query = normalize(query).reshape(-1)
+        if len(query) != self.dim:
+            raise ValueError(f"Dimensi embedding {len(query)} tidak sama dengan indeks ({self.dim}).")
+        scores = query @ vectors[:, :count]
+        k = min(k, count)
+        top = np.argpartition(scores, -k)[-k:] if count > k else np.arange(count)
+        order = top[np.argsort(scores[top])[::-1]]
+        return [{**meta[i], "score": float(scores[i])} for i in order]
+
+
+# -------------------- Ekstraksi Embedding dari Galeri --------------------
+def embed_paths(backend, paths, batch_size=32):
+    batch = np.empty((batch_size, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+    batch_paths = []
+    for i, path in enumerate(paths):
+        try:
+            load_and_preprocess(path, out=batch[len(batch_paths)])
+            batch_paths.append(path)
+        except Exception as e:
+            print(f"Lewati {path}: {e}", file=sys.stderr)
+        if batch_paths and (len(batch_paths) == batch_size or i == len(paths) - 1):
+            prediction, embeddings = backend.predict_with_embedding(batch[: len(batch_paths)])
+            metadata = [
+                {"path": p, "label": class_names[int(np.argmax(pred))]} for p, pred in zip(batch_paths, prediction)
+            ]
+            yield embeddings, metadata
+            batch_paths = []
+
+
+def positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError("harus lebih dari 0")
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indeks kemiripan motif batik Lokatmala.")
+    parser.add_argument("command", choices=["build", "add", "query"])
+    parser.add_argument("source", help="Folder/manifest gambar (build, add) atau satu gambar (query)")
+    parser.add_argument("--index", default=INDEX_DIR)
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("-k", type=positive_int, default=5)
+    args = parser.parse_args(argv)
+
+    backend = SavedModelBackend(args.model_dir)
+    fingerprint = model_fingerprint(args.model_dir)
+
+    if args.command == "query":
+        _, embedding = backend.predict_with_embedding(load_and_preprocess(args.source)[np.newaxis])
+        for hit in EmbeddingIndex(args.index).search(embedding[0], k=args.k):
+            print(f"{hit['score']:.4f}  {hit['label']:<25} {hit['path']}")
+        return
+
+    if args.command == "build":
+        for name in (VECTORS_FILE, META_FILE, INFO_FILE):
+            path = os.path.join(args.index, name)
+            if os.path.exists(path):
+                os.remove(path)
+    index = EmbeddingIndex(args.index)
+    known = {item["path"] for item in index.meta}
+    paths = [p for p in list_images(args.source) if p not in known]
+    for embeddings, metadata in embed_paths(backend, paths, args.batch_size):
+        index.add(embeddings, metadata, fingerprint=fingerprint)
+        print(f"{index.count} gambar di indeks", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
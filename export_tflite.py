@@ -0,0 +1,111 @@
+import argparse
+import json
+import os
+import random
+import sys
+
+import numpy as np
+
+from backends import (
+    PARITY_REPORT, TFLITE_DIR, TFLITE_VARIANTS, SavedModelBackend, TFLiteBackend, check_parity, parity_passed,
+)
+from batch_classify import list_images
+from lokatmala import IMG_SIZE, MODEL_DIR, load_and_preprocess
+from prediction_cache import model_fingerprint
+
+# -------------------- Ekspor TFLite (float16 & int8) --------------------
+# Contoh:
+#   python export_tflite.py --calibration-dir sampel_batik/ --parity-dir validasi_batik/
+#
+# Hasil: Lokatmala_tflite/model_fp16.tflite, model_int8.tflite dan parity.json.
+# backends.load_backend() hanya memakai varian yang lulus paritas di sini.
+
+
+def load_arrays(paths):
+    arrays = []
+    for path in paths:
+        try:
+            arrays.append(load_and_preprocess(path))
+        except Exception as e:
+            print(f"Lewati {path}: {e}", file=sys.stderr)
+    return np.stack(arrays) if arrays else np.empty((0, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+
+
+def convert(model_dir, variant, calibration=None):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_saved_model(model_dir)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == "tflite-fp16":
+        converter.target_spec.supported_types = [tf.float16]
+    else:
+        def representative_dataset():
+            for img_array in calibration:
+                yield [img_array[np.newaxis]]
+
+        # Bobot & aktivasi int8; input/output tetap float32 agar preprocessing sama
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    return converter.convert()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ekspor SavedModel Lokatmala ke TFLite dan uji paritas.")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--output-dir", default=TFLITE_DIR)
+    parser.add_argument("--calibration-dir", required=True, help="Gambar batik representatif untuk kuantisasi int8")
+    parser.add_argument("--num-calibration", type=int, default=200)
+    parser.add_argument(
+        "--parity-dir", required=True, help="Gambar held-out untuk uji paritas (tidak boleh sama dengan kalibrasi)"
+    )
+    parser.add_argument("--variants", nargs="+", choices=list(TFLITE_VARIANTS), default=list(TFLITE_VARIANTS))
+    parser.add_argument("--min-agreement", type=float, default=1.0, help="Minimal kesepakatan top-1 (0-1)")
+    parser.add_argument("--max-drift", type=float, default=0.05, help="Maksimal selisih confidence absolut")
+    args = parser.parse_args(argv)
+
+    calibration_paths = list_images(args.calibration_dir)
+    random.Random(0).shuffle(calibration_paths)
+    calibration_paths = calibration_paths[: args.num_calibration]
+    calibration = load_arrays(calibration_paths)
+    # Paritas diukur pada gambar yang tidak ikut kalibrasi int8
+    used = {os.path.realpath(p) for p in calibration_paths}
+    parity_paths = [p for p in list_images(args.parity_dir) if os.path.realpath(p) not in used]
+    parity_images = load_arrays(parity_paths)
+    if len(calibration) == 0 or len(parity_images) == 0:
+        parser.error("Tidak ada gambar valid untuk kalibrasi/paritas held-out.")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    reference = SavedModelBackend(args.model_dir)
+    report_path = os.path.join(args.output_dir, PARITY_REPORT)
+    try:
+        with open(report_path, encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        report = {}
+
+    for variant in args.variants:
+        model_path = os.path.join(args.output_dir, TFLITE_VARIANTS[variant])
+        with open(model_path, "wb") as f:
+            f.write(convert(args.model_dir, variant, calibration))
+
+        result = check_parity(TFLiteBackend(model_path, name=variant), reference, parity_images)
+        result.update(
+            model_fingerprint=model_fingerprint(args.model_dir),
+            min_agreement=args.min_agreement,
+            max_drift=args.max_drift,
+            passed=parity_passed(result, args.min_agreement, args.max_drift),
+            size_bytes=os.path.getsize(model_path),
+        )
+        report[variant] = result
+        status = "LULUS" if result["passed"] else "GAGAL"
+        print(
+            f"{variant}: {status} — top-1 {result['top1_agreement']:.2%}, "
+            f"drift maks {result['max_confidence_drift']:.4f}, {result['size_bytes'] / 1e6:.1f} MB"
+        )
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
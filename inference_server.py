@@ -0,0 +1,215 @@
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from backends import BACKENDS, load_backend
+import metrics
+from lokatmala import MODEL_DIR, class_names, filosofi_dict, load_and_preprocess, top_k
+
+# -------------------- Layanan HTTP Inferensi Lokal --------------------
+# Contoh:
+#   python inference_server.py serve --port 8502 --max-batch 16 --max-wait-ms 10
+#   python inference_server.py predict contoh.jpg --url http://127.0.0.1:8502
+#
+# Permintaan yang datang bersamaan dikumpulkan oleh MicroBatcher menjadi satu
+# panggilan serving_default, sehingga CPU bekerja dengan batch > 1 saat ramai.
+
+MAX_BODY_BYTES = 20 * 1024 * 1024
+
+
+class MicroBatcher:
+    def __init__(self, predict, max_batch=16, max_wait=0.01):
+        self._predict = predict
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, img_array):
+        future = Future()
+        self._queue.put((img_array, future))
+        return future
+
+    def predict(self, img_array, timeout=None):
+        return self.submit(img_array).result(timeout=timeout)
+
+    def _collect(self):
+        pending = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(pending) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                pending.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return pending
+
+    def _loop(self):
+        while True:
+            pending = self._collect()
+            futures = [future for _, future in pending]
+            try:
+                batch = np.stack([img_array for img_array, _ in pending])
+                predictions = self._predict(batch)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(pending)
+            for future, prediction in zip(futures, predictions):
+                future.set_result(prediction)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "queue_size": self._queue.qsize(),
+        }
+
+
+def format_prediction(prediction, k=3):
+    prediction = np.asarray(prediction, dtype=np.float32)
+    predicted_class = class_names[int(np.argmax(prediction))]
+    return {
+        "motif": predicted_class,
+        "confidence": float(np.max(prediction)),
+        "filosofi": filosofi_dict.get(predicted_class, "Filosofi tidak ditemukan."),
+        "top_k": [{"class": name, "confidence": conf} for name, conf in top_k(prediction, k)],
+        "probabilities": prediction.tolist(),
+    }
+
+
+# -------------------- Handler HTTP --------------------
+class InferenceHandler(BaseHTTPRequestHandler):
+    batcher = None
+    request_timeout = 30.0
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", **self.batcher.stats()})
+        elif self.path == "/metrics":
+            body = metrics.registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "Endpoint tidak ditemukan."})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": "Endpoint tidak ditemukan."})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self._send_json(400, {"error": "Header Content-Length tidak valid."})
+            return
+        if length <= 0:
+            self._send_json(400, {"error": "Body kosong, kirim byte gambar."})
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": "Gambar terlalu besar."})
+            return
+        trace = metrics.RequestTrace(source="http")
+        try:
+            with trace.span("decode"):
+                img_array = load_and_preprocess(self.rfile.read(length))
+        except Exception:
+            # Apa pun yang gagal saat decode (format, file terpotong, bom dekompresi, dll.)
+            self._send_json(400, {"error": "File yang dikirim bukan gambar yang valid."})
+            return
+        try:
+            with trace.span("infer"):
+                prediction = self.batcher.predict(img_array, timeout=self.request_timeout)
+        except Exception as e:
+            self._send_json(500, {"error": f"Gagal menjalankan inferensi: {e}"})
+            return
+        with trace.span("render"):
+            result = format_prediction(prediction)
+        self._send_json(200, result)
+        trace.finish(result["motif"], result["confidence"] * 100)
+
+    def log_message(self, format, *args):
+        pass  # hindari log per permintaan di stderr
+
+
+def serve(host="127.0.0.1", port=8502, model_dir=MODEL_DIR, max_batch=16, max_wait=0.01, backend=None):
+    backend = load_backend(backend, model_dir=model_dir)
+    InferenceHandler.batcher = MicroBatcher(backend.predict, max_batch=max_batch, max_wait=max_wait)
+    server = ThreadingHTTPServer((host, port), InferenceHandler)
+    server.daemon_threads = True
+    metrics.start_file_exporter()
+    print(f"Layanan inferensi berjalan di http://{host}:{port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# -------------------- Klien Lokal --------------------
+def predict_remote(url, image_bytes, timeout=30.0):
+    request = urllib.request.Request(
+        url.rstrip("/") + "/predict",
+        data=image_bytes,
+        headers={"Content-Type": "application/octet-stream"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Layanan HTTP inferensi motif batik Lokatmala.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="Jalankan layanan inferensi")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8502)
+    p_serve.add_argument("--model-dir", default=MODEL_DIR)
+    p_serve.add_argument("--backend", choices=BACKENDS, help="Default: LOKATMALA_BACKEND atau savedmodel")
+    p_serve.add_argument("--max-batch", type=int, default=16)
+    p_serve.add_argument("--max-wait-ms", type=float, default=10.0)
+
+    p_predict = sub.add_parser("predict", help="Kirim gambar ke layanan yang sedang berjalan")
+    p_predict.add_argument("images", nargs="+")
+    p_predict.add_argument("--url", default="http://127.0.0.1:8502")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        serve(args.host, args.port, args.model_dir, args.max_batch, args.max_wait_ms / 1000.0, args.backend)
+    else:
+        for path in args.images:
+            with open(path, "rb") as f:
+                result = predict_remote(args.url, f.read())
+            print(f"{path}: {result['motif']} ({result['confidence'] * 100:.2f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+import atexit
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as _Tally
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -------------------- Metrik & Timing per Tahap --------------------
+# Setiap prediksi dibungkus RequestTrace: tahap decode, resize, to_array,
+# infer dan render diukur dengan span lalu dikumpulkan ke histogram dan
+# counter. Hasilnya tersedia sebagai log JSON (logger "lokatmala.metrics")
+# dan teks format Prometheus (file, endpoint /metrics, atau keduanya).
+#
+# Variabel lingkungan:
+#   LOKATMALA_METRICS_FILE        tulis teks Prometheus ke file ini (berkala)
+#   LOKATMALA_METRICS_INTERVAL    jeda penulisan file dalam detik (default 15)
+#   LOKATMALA_METRICS_PORT        layani /metrics di port ini
+#   LOKATMALA_PROFILE_DIR         aktifkan profiler sampling untuk outlier
+#   LOKATMALA_PROFILE_RATE        fraksi permintaan yang di-sample (default 0.05)
+#   LOKATMALA_PROFILE_THRESHOLD_MS  batas outlier (default 2000)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOW_CONFIDENCE = 70.0
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # slot terakhir = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (nama, label) → Histogram
+        self._counters = {}  # (nama, label) → float
+        self._help = {}
+
+    def observe(self, name, value, help_text="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(value)
+
+    def inc(self, name, amount=1, help_text="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                (key, (list(h.buckets), list(h.counts), h.sum, h.count)) for key, h in self._histograms.items()
+            )
+            help_texts = dict(self._help)
+
+        lines = []
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                lines += [f"# HELP {name} {help_texts.get(name, '')}", f"# TYPE {name} counter"]
+                seen.add(name)
+            lines.append(f"{name}{_labels(labels)} {value:g}")
+        for (name, labels), (buckets, counts, total, count) in histograms:
+            if name not in seen:
+                lines += [f"# HELP {name} {help_texts.get(name, '')}", f"# TYPE {name} histogram"]
+                seen.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+registry = Registry()
+
+
+def _json_logger():
+    logger = logging.getLogger("lokatmala.metrics")
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+# -------------------- Profiler Sampling untuk Outlier --------------------
+class StackSampler:
+    # Mengambil stack thread target setiap interval; hasil disimpan dalam
+    # format "collapsed" (bisa dibaca flamegraph.pl / speedscope).
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = _Tally()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return  # thread target sudah selesai; jangan polling selamanya
+            stack = traceback.extract_stack(frame)
+            self.samples[";".join(f"{f.name} ({os.path.basename(f.filename)}:{f.lineno})" for f in stack)] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# -------------------- Trace per Prediksi --------------------
+class RequestTrace:
+    def __init__(self, source="unknown"):
+        self.source = source
+        self.spans = {}
+        self.started_at = time.perf_counter()
+        self._sampler = None
+        self._profile = bool(os.environ.get("LOKATMALA_PROFILE_DIR")) and (
+            random.random() < float(os.environ.get("LOKATMALA_PROFILE_RATE", "0.05"))
+        )
+
+    @contextmanager
+    def span(self, stage):
+        if self._profile and self._sampler is None:
+            # Dimulai di span pertama, bukan saat trace dibuat, agar trace tanpa span tidak menyisakan thread
+            self._sampler = StackSampler(threading.get_ident()).start()
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            registry.inc("lokatmala_errors_total", help_text="Kesalahan per tahap", stage=stage)
+            self.spans[stage] = time.perf_counter() - start
+            self.finish(error=stage)
+            raise
+        except BaseException:
+            # Rerun/stop Streamlit di tengah tahap bukan kesalahan, tapi profiler harus berhenti
+            if self._sampler is not None:
+                self._sampler.stop()
+                self._sampler = None
+            raise
+        elapsed = time.perf_counter() - start
+        self.spans[stage] = self.spans.get(stage, 0.0) + elapsed
+        registry.observe("lokatmala_stage_seconds", elapsed, help_text="Durasi per tahap prediksi", stage=stage)
+
+    def finish(self, predicted_class=None, confidence=None, cached=None, error=None):
+        total = time.perf_counter() - self.started_at
+        record = {
+            "event": "prediction",
+            "source": self.source,
+            "spans_ms": {stage: round(value * 1000, 3) for stage, value in self.spans.items()},
+            "total_ms": round(total * 1000, 3),
+        }
+        if error is None:
+            # Hasil dari cache (mis. rerun Streamlit untuk gambar yang sama) bukan prediksi baru
+            if not cached:
+                registry.observe("lokatmala_request_seconds", total, help_text="Durasi total prediksi")
+                registry.inc("lokatmala_predictions_total", help_text="Prediksi per motif", motif=predicted_class)
+                if confidence is not None and confidence < LOW_CONFIDENCE:
+                    registry.inc("lokatmala_low_confidence_total", help_text="Prediksi dengan keyakinan < 70%")
+            if cached is not None:
+                registry.inc("lokatmala_cache_requests_total", help_text="Lookup cache prediksi",
+                             result="hit" if cached else "miss")
+            record.update(motif=predicted_class, confidence=None if confidence is None else round(float(confidence), 3),
+                          cached=cached)
+        else:
+            record["error"] = error
+
+        if self._sampler is not None:
+            self._sampler.stop()
+            threshold = float(os.environ.get("LOKATMALA_PROFILE_THRESHOLD_MS", "2000")) / 1000
+            if total >= threshold:
+                path = os.path.join(os.environ["LOKATMALA_PROFILE_DIR"], f"outlier-{int(time.time() * 1000)}.folded")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._sampler.dump(path)
+                record["profile"] = path
+            self._sampler = None
+        self._profile = False
+
+        _json_logger().info(json.dumps(record, ensure_ascii=False))
+
+
+# -------------------- Ekspor Prometheus --------------------
+def export_file(path=None):
+    path = path or os.environ.get("LOKATMALA_METRICS_FILE")
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(registry.render())
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def start_file_exporter(path=None, interval=None):
+    # File ditulis ulang di thread latar setiap interval, bukan di setiap permintaan
+    path = path or os.environ.get("LOKATMALA_METRICS_FILE")
+    if not path:
+        return None
+    interval = interval or float(os.environ.get("LOKATMALA_METRICS_INTERVAL", "15"))
+    stop = threading.Event()
+
+    def _run():
+        while not stop.wait(interval):
+            export_file(path)
+
+    threading.Thread(target=_run, name="metrics-file-exporter", daemon=True).start()
+    atexit.register(export_file, path)  # snapshot terakhir saat proses berhenti
+    return stop
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
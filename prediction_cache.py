@@ -0,0 +1,127 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+# -------------------- Cache Prediksi Berbasis Hash Konten --------------------
+# Streamlit menjalankan ulang app.py setiap ada interaksi widget. Cache ini
+# menyimpan hasil inferensi per gambar (vektor softmax, dan embedding bila
+# indeks kemiripan aktif) dengan kunci hash byte mentah + fingerprint model,
+# agar gambar yang sama tidak perlu melewati CNN lagi.
+
+# Naikkan jika bentuk nilai yang disimpan berubah, agar snapshot lama diabaikan
+CACHE_FORMAT = 2
+
+
+def model_fingerprint(model_dir="Lokatmala_saved"):
+    path = os.path.join(model_dir, "fingerprint.pb")
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return "tanpa-fingerprint"
+
+
+class PredictionCache:
+    def __init__(self, maxsize=256, ttl=3600, persist_path=None, fingerprint=""):
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.persist_path = persist_path
+        self.fingerprint = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        if persist_path:
+            self._load()
+
+    def make_key(self, image_bytes, variant=""):
+        h = hashlib.sha256(f"{self.fingerprint}|{variant}".encode())
+        h.update(image_bytes)
+        return h.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl is None or time.time() - stored_at <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        if self.persist_path:
+            self._save()
+
+    def get_or_compute(self, image_bytes, compute, variant=""):
+        key = self.make_key(image_bytes, variant)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        with self._lock:
+            size = len(self._data)
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+        if self.persist_path:
+            self._save()
+
+    # -------------------- Persistensi ke Disk --------------------
+    def _load(self):
+        try:
+            with open(self.persist_path, "rb") as f:
+                saved = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return
+        # Entri dari model lain tidak berlaku lagi
+        if saved.get("fingerprint") != self.fingerprint or saved.get("format") != CACHE_FORMAT:
+            return
+        now = time.time()
+        for key, (stored_at, value) in saved.get("entries", []):
+            if self.ttl is None or now - stored_at <= self.ttl:
+                self._data[key] = (stored_at, value)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def _save(self):
+        with self._lock:
+            snapshot = {"fingerprint": self.fingerprint, "format": CACHE_FORMAT, "entries": list(self._data.items())}
+        tmp_path = f"{self.persist_path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.persist_path)
+        except OSError:
+            pass
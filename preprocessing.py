@@ -0,0 +1,179 @@
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageOps
+
+# -------------------- Preprocessing Gambar Satu Kali Jalan --------------------
+# Menggantikan pola Image.open → verify() → seek(0) → Image.open → resize
+# resolusi penuh. Gambar divalidasi sekaligus di-decode satu kali, JPEG
+# di-decode langsung di skala kecil (draft mode), format lain (PNG dll.)
+# diperkecil dengan reduce() sebelum konversi warna, orientasi EXIF
+# diterapkan, mode warna diseragamkan ke RGB lalu ditulis ke buffer float32.
+
+IMG_SIZE = (224, 224)
+
+# Gambar besar diperkecil bertahap dengan reduce() sebelum resample akhir
+REDUCING_GAP = 3.0
+
+
+def load_image(source, size=IMG_SIZE):
+    # source: bytes, path, atau file-like (UploadedFile Streamlit)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    image = Image.open(source)
+    is_jpeg = image.format == "JPEG"
+    if is_jpeg:
+        # Decoder JPEG memilih skala 1/2, 1/4 atau 1/8 yang masih >= size
+        image.draft("RGB", size)
+    image.load()  # decode penuh; file rusak/terpotong gagal di sini
+    image = ImageOps.exif_transpose(image)
+    if not is_jpeg:
+        image = shrink(to_8bit(image), size)
+    return to_rgb(image)
+
+
+def to_8bit(image):
+    # PNG grayscale 16-bit dibuka sebagai I;16 atau I (nilai 0-65535); convert()
+    # memotong nilai > 255 sehingga abu-abu menjadi putih. Ambil 8 bit teratas.
+    if image.mode.startswith("I"):
+        pixels = np.asarray(image).astype(np.uint32) >> 8
+        return Image.fromarray(np.minimum(pixels, 255).astype(np.uint8), "L")
+    return image
+
+
+def shrink(image, size):
+    # Perkecil dengan faktor bulat sampai ±2x ukuran target sebelum konversi warna
+    # dan komposisi alpha, agar keduanya tidak dijalankan di resolusi penuh.
+    factor = min(image.width // (2 * size[0]), image.height // (2 * size[1]))
+    if factor < 2:
+        return image
+    if image.mode == "P":
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = to_rgb(image)
+    return image.reduce(factor)  # RGBA/LA dirata-rata dengan alpha premultiplied
+
+
+def to_rgb(image):
+    if image.mode == "RGB":
+        return image
+    image = to_8bit(image)
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        # Area transparan diberi latar putih, bukan hitam
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def resize_image(image):
+    if image.mode != "RGB":
+        image = to_rgb(image)
+    if image.size != IMG_SIZE:
+        image = image.resize(IMG_SIZE, Image.BICUBIC, reducing_gap=REDUCING_GAP)
+    return image
+
+
+def normalize(pixels, out=None):
+    # uint8 (224, 224, 3) → float32 [0, 1], ditulis langsung ke buffer tujuan
+    if out is None:
+        out = np.empty((IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+    np.divide(pixels, np.float32(255.0), out=out)
+    return out
+
+
+def preprocess_image(image, out=None):
+    return normalize(np.asarray(resize_image(image), dtype=np.uint8), out=out)
+
+
+def load_and_preprocess(source, out=None):
+    return preprocess_image(load_image(source), out=out)
+
+
+def load_pixels(source):
+    # Versi uint8 tanpa normalisasi; 4x lebih kecil untuk dikirim antar proses
+    return np.asarray(resize_image(load_image(source)), dtype=np.uint8)
+
+
+# -------------------- Pengukuran Sebelum / Sesudah --------------------
+# python preprocessing.py foto1.jpg foto2.png --repeat 20
+# Setiap mode dijalankan di proses terpisah agar peak RSS tidak tercampur.
+
+def _legacy_preprocess(data):
+    image = Image.open(io.BytesIO(data))
+    image.verify()
+    image = Image.open(io.BytesIO(data))
+    img_resized = image.resize(IMG_SIZE)
+    img_array = np.array(img_resized) / 255.0
+    img_array = img_array.astype(np.float32)
+    return np.expand_dims(img_array, axis=0)
+
+
+def _fast_preprocess(data, out):
+    load_and_preprocess(data, out=out[0])
+    return out
+
+
+def peak_rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KiB, macOS melaporkan byte
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _measure(mode, paths, repeat):
+    blobs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            blobs.append(f.read())
+    out = np.empty((1, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+    baseline_rss = peak_rss_mb()
+    timings = []
+    for _ in range(repeat):
+        for data in blobs:
+            start = time.perf_counter()
+            if mode == "legacy":
+                _legacy_preprocess(data)
+            else:
+                _fast_preprocess(data, out)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings = np.array(timings)
+    return {
+        "mode": mode,
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_growth_mb": peak_rss_mb() - baseline_rss,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bandingkan preprocessing lama vs satu kali jalan.")
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--mode", choices=["legacy", "fast"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        print(json.dumps(_measure(args.mode, args.images, args.repeat)))
+        return
+
+    for mode in ("legacy", "fast"):
+        cmd = [sys.executable, os.path.abspath(__file__), *args.images, "--repeat", str(args.repeat), "--mode", mode]
+        result = json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout)
+        print(
+            f"{mode:>6}: p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+            f"peak RSS {result['peak_rss_mb']:.0f} MB (+{result['rss_growth_mb']:.0f} MB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
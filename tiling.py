@@ -0,0 +1,117 @@
+import time
+
+import numpy as np
+from PIL import Image
+
+from preprocessing import IMG_SIZE, REDUCING_GAP, load_image, preprocess_image
+
+# -------------------- Inferensi Multi-Tile (Mode Akurasi Tinggi) --------------------
+# Foto kain utuh yang diperkecil ke 224x224 kehilangan detail pola. Mode ini
+# memotong gambar menjadi tile 224px yang saling tumpang tindih pada satu atau
+# dua skala, lalu menjalankan setiap tahap sebagai SATU panggilan batch.
+# Tahap 1: tampilan utuh + tile skala kasar. Tahap 2 (skala halus) hanya
+# dijalankan jika keyakinan gabungan masih di bawah ambang 70%, dan selalu
+# dibatasi jumlah tile maksimum serta anggaran latensi: biaya per tile dari
+# tahap sebelumnya dipakai untuk memangkas jumlah tile tahap berikutnya agar
+# muat di sisa anggaran. Skala yang lebih besar dari resolusi asli dilewati
+# (memperbesar gambar tidak menambah detail), dan gambar yang sudah mendekati
+# 224px hanya diprediksi utuh.
+
+TILE = IMG_SIZE[0]
+DEFAULT_SCALES = (448, 672)  # sisi terpendek gambar (px) per skala
+CONFIDENCE_THRESHOLD = 0.70
+MIN_TILING_SIDE = int(TILE * 1.5)  # di bawah ini tile hampir sama dengan tampilan utuh
+
+
+def _resize_short_side(image, short_side):
+    width, height = image.size
+    factor = short_side / min(width, height)
+    size = (max(TILE, round(width * factor)), max(TILE, round(height * factor)))
+    return image.resize(size, Image.BICUBIC, reducing_gap=REDUCING_GAP)
+
+
+def _positions(length, stride):
+    if length <= TILE:
+        return [0]
+    positions = list(range(0, length - TILE + 1, stride))
+    if positions[-1] != length - TILE:
+        positions.append(length - TILE)  # tile terakhir menempel ke tepi
+    return positions
+
+
+def make_tiles(image, short_side, overlap=0.25, limit=None):
+    scaled = _resize_short_side(image, short_side)
+    stride = max(1, int(TILE * (1 - overlap)))
+    boxes = [
+        (x, y, x + TILE, y + TILE)
+        for y in _positions(scaled.size[1], stride)
+        for x in _positions(scaled.size[0], stride)
+    ]
+    if limit is not None and len(boxes) > limit:
+        # Ambil tile yang tersebar merata, bukan hanya baris atas
+        boxes = [boxes[i] for i in np.linspace(0, len(boxes) - 1, limit).round().astype(int)]
+    return [scaled.crop(box) for box in boxes]
+
+
+def aggregate(predictions, method="mean"):
+    predictions = np.asarray(predictions, dtype=np.float32)
+    if method == "vote":
+        votes = np.bincount(np.argmax(predictions, axis=1), minlength=predictions.shape[1])
+        return votes.astype(np.float32) / len(predictions)
+    return predictions.mean(axis=0)
+
+
+def predict_tiled(predict, image_bytes, scales=DEFAULT_SCALES, overlap=0.25, method="mean",
+                  max_tiles=24, max_latency=1.5, threshold=CONFIDENCE_THRESHOLD):
+    start = time.perf_counter()
+    # Decode cukup besar untuk skala terhalus, bukan resolusi penuh kamera
+    longest = max(scales) * 2
+    image = load_image(image_bytes, size=(longest, longest))
+
+    native = min(image.size)
+    usable = [s for s in scales if s <= native] if native >= MIN_TILING_SIDE else []
+    predictions = []
+    stages = []
+    stop_reason = "all_scales" if usable else "small_image"
+    remaining = max(1, int(max_tiles))
+    limit, capped_by = remaining - 1, "tile_limit"
+    for stage, short_side in enumerate(usable or [None]):
+        stage_start = time.perf_counter()
+        tiles = make_tiles(image, short_side, overlap, limit=limit) if short_side and limit > 0 else []
+        if usable and len(tiles) >= limit:
+            stop_reason = capped_by  # tahap ini terpotong; sisa tile tidak dijalankan
+        if stage == 0:
+            tiles.insert(0, image)  # tampilan utuh seperti mode biasa
+        batch = np.empty((len(tiles), IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+        for i, tile in enumerate(tiles):
+            preprocess_image(tile, out=batch[i])
+        predictions.extend(predict(batch))
+        remaining -= len(tiles)
+        per_tile = (time.perf_counter() - stage_start) / len(tiles)
+        stages.append({"short_side": short_side, "tiles": len(tiles)})
+
+        combined = aggregate(predictions, method)
+        if stage >= len(usable) - 1:
+            break
+        # Tahap berikutnya hanya sebanyak tile yang masih muat di sisa anggaran
+        budget_left = max_latency - (time.perf_counter() - start)
+        affordable = int(budget_left / per_tile)
+        limit, capped_by = (affordable, "budget") if affordable < remaining else (remaining, "tile_limit")
+        if combined.max() >= threshold:
+            stop_reason = "confident"
+        elif remaining <= 0:
+            stop_reason = "tile_limit"
+        elif limit <= 0:
+            stop_reason = "budget"
+        else:
+            continue
+        break
+
+    combined = aggregate(predictions, method)
+    return combined[np.newaxis], {
+        "tiles": len(predictions),
+        "stages": stages,
+        "early_exit": stop_reason == "confident",
+        "stop_reason": stop_reason,  # confident / tile_limit / budget / all_scales / small_image
+        "elapsed_s": time.perf_counter() - start,
+    }
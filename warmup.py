@@ -0,0 +1,72 @@
+import sys
+import threading
+import time
+
+import numpy as np
+
+from preprocessing import IMG_SIZE
+
+# -------------------- Pemanasan Model di Latar Belakang --------------------
+# Model dimuat (termasuk impor TensorFlow yang berat) dan dijalankan sekali
+# dengan input dummy 1x224x224x3 di thread terpisah, sehingga halaman bisa
+# tampil lebih dulu dan prediksi pertama tidak menanggung tracing graph.
+# warmup(backend) bisa diganti agar jalur yang dipanaskan sama dengan yang dipakai.
+
+
+def dummy_batch():
+    return np.zeros((1, IMG_SIZE[1], IMG_SIZE[0], 3), dtype=np.float32)
+
+
+def warm_predict(backend):
+    backend.predict(dummy_batch())
+
+
+class BackgroundModel:
+    def __init__(self, factory, warmup=warm_predict):
+        self.started_at = time.perf_counter()
+        self.timings = {}
+        self._factory = factory
+        self._warmup = warmup
+        self._backend = None
+        self._error = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            start = time.perf_counter()
+            backend = self._factory()
+            self.timings["load_s"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self._warmup(backend)
+            self.timings["warmup_s"] = time.perf_counter() - start
+            self._backend = backend
+        except Exception as e:
+            self._error = e
+        finally:
+            self.timings["ready_s"] = time.perf_counter() - self.started_at
+            self._ready.set()
+            self._report("model siap" if self._error is None else f"model gagal dimuat: {self._error}")
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def get(self, timeout=None):
+        if not self._ready.wait(timeout):
+            raise TimeoutError("Model belum selesai dimuat.")
+        if self._error is not None:
+            raise self._error
+        return self._backend
+
+    def mark(self, name):
+        # Catat tonggak lain (mis. first paint) relatif terhadap awal startup
+        if name not in self.timings:
+            self.timings[name] = time.perf_counter() - self.started_at
+            self._report(name)
+
+    def _report(self, event):
+        parts = ", ".join(f"{key}={value:.2f}s" for key, value in self.timings.items())
+        print(f"[cold start] {event}: {parts}", file=sys.stderr)